@@ -16,13 +16,19 @@ Config:
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import shlex
 import shutil
 import subprocess
 import sys
+import tempfile
+from collections.abc import Iterator
 from pathlib import Path
 
-import tomllib
-
 
 EXIT_OK = 0
 EXIT_ENV = 1
@@ -31,6 +37,12 @@ EXIT_INVALID = 2
 PREFIX = "dw_"
 DEFAULT_PROVIDER = "gh"
 
+_VALID_KEY = re.compile(re.escape(PREFIX) + r"\S+")
+_NONEMPTY = re.compile(r"\S")
+
+# A `gh alias list` line whose alias name (after optional indentation) is ours.
+_DW_LINE_RE = re.compile(r"\s*" + re.escape(PREFIX))
+
 
 def _out(message: str) -> None:
     print(f"dotwrap: {message}")
@@ -46,8 +58,14 @@ def require_python_311() -> None:
         raise SystemExit(EXIT_ENV)
 
 
+@functools.lru_cache(maxsize=1)
+def _which_gh() -> str | None:
+    # PATH is walked once per process; call _which_gh.cache_clear() after changing it.
+    return shutil.which("gh")
+
+
 def require_gh() -> None:
-    if shutil.which("gh") is None:
+    if _which_gh() is None:
         _err("missing required tool: gh (GitHub CLI) not found on PATH")
         raise SystemExit(EXIT_ENV)
 
@@ -56,7 +74,15 @@ def config_path() -> Path:
     return Path(__file__).resolve().parent / "aliases.toml"
 
 
+def state_path() -> Path:
+    return config_path().with_name(".dotwrap_state.json")
+
+
 def collapse_whitespace(value: str) -> str:
+    # Fast path for already-normalized commands: the only whitespace that
+    # isprintable() lets through is " ", so tabs/newlines take the slow path.
+    if value.isprintable() and "  " not in value and value[:1] != " " and value[-1:] != " ":
+        return value
     return " ".join(value.split())
 
 
@@ -66,9 +92,17 @@ def _load_config() -> dict:
         _err("missing aliases.toml next to dotwrap.py")
         raise SystemExit(EXIT_ENV)
 
+    stat = path.stat()
+    return _load_config_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config_cached(path: str, mtime_ns: int, size: int) -> dict:
+    # mtime_ns/size are only part of the cache key: an edited file misses the cache.
+    import tomllib  # deferred: doctor never reads the config
+
     try:
-        with path.open("rb") as f:
-            return tomllib.load(f)
+        return tomllib.loads(Path(path).read_bytes().decode("utf-8"))
     except Exception as exc:
         _err(f"invalid aliases.toml: {exc}")
         raise SystemExit(EXIT_ENV)
@@ -90,29 +124,110 @@ def _get_provider_aliases(data: dict, provider: str) -> dict[str, str]:
         _err(f"missing or empty [providers.{provider}.aliases]")
         raise SystemExit(EXIT_ENV)
 
-    out: dict[str, str] = {}
     for name, cmd in aliases.items():
-        if not isinstance(name, str) or not name:
-            _err("alias keys must be non-empty strings")
-            raise SystemExit(EXIT_ENV)
-        if not name.startswith(PREFIX):
-            _err(f"invalid alias key (must start with {PREFIX}): {name}")
+        if not isinstance(name, str) or not _VALID_KEY.fullmatch(name):
+            _err(f"invalid alias key (must be {PREFIX}<name> without whitespace): {name}")
             raise SystemExit(EXIT_ENV)
-        if not isinstance(cmd, str) or not cmd.strip():
+        if not isinstance(cmd, str) or not _NONEMPTY.search(cmd):
             _err(f"alias command must be a non-empty string: {name}")
             raise SystemExit(EXIT_ENV)
-        out[name] = collapse_whitespace(cmd)
 
-    return out
+    # Sorted once here; callers rely on insertion order for deterministic installs.
+    return {name: collapse_whitespace(cmd) for name, cmd in sorted(aliases.items())}
+
+
+def _digest(cmd: str) -> str:
+    return hashlib.sha256(cmd.encode("utf-8")).hexdigest()
+
+
+def _load_state() -> dict:
+    # {provider: {alias name: sha256 of the installed command}}
+    try:
+        state = json.loads(state_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _save_state(state: dict) -> None:
+    path = state_path()
+    try:
+        if state:
+            path.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        else:
+            path.unlink(missing_ok=True)
+    except OSError:
+        # The state file only lets install skip work; losing it is harmless.
+        pass
+
+
+def _iter_gh_lines(args: list[str]) -> Iterator[str]:
+    """Yield lines of `gh <args>` stdout as they arrive.
+
+    Raises CalledProcessError (carrying gh's stderr) once the output ends if gh failed.
+    """
+    # stderr goes to a file, not a pipe: an unread stderr pipe that fills up
+    # would block gh while we are still waiting on stdout.
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as err_file:
+        with subprocess.Popen(
+            ["gh", *args],
+            stdout=subprocess.PIPE,
+            stderr=err_file,
+            text=True,
+        ) as proc:
+            for line in proc.stdout:
+                yield line.rstrip("\n")
+        err_file.seek(0)
+        stderr = err_file.read()
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args, stderr=stderr)
+
+
+class _GhSession:
+    """Run gh commands through one long-lived shell instead of a subprocess per call.
+
+    Commands run strictly in order: every `gh alias set/delete` rewrites gh's
+    config file, so running them concurrently would drop aliases.
+    """
+
+    _DONE = "__DW_DONE_"
+
+    def __enter__(self) -> _GhSession:
+        try:
+            self._proc = subprocess.Popen(
+                ["sh"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+        except OSError as exc:
+            _err(f"missing required tool: sh (POSIX shell) could not be started: {exc}")
+            raise SystemExit(EXIT_ENV)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._proc.stdin.close()
+        self._proc.wait()
+        self._proc.stdout.close()
 
+    def run(self, args: list[str], *, capture: bool = True) -> tuple[int, str]:
+        """Run `gh <args>` and return its exit code and combined stdout/stderr.
 
-def _run_gh(args: list[str], *, check: bool) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(
-        ["gh", *args],
-        text=True,
-        capture_output=True,
-        check=check,
-    )
+        With capture=False gh's output goes to /dev/null in the shell and "" is returned.
+        """
+        command = shlex.join(["gh", *args])
+        redirect = "2>&1" if capture else ">/dev/null 2>&1"
+        self._proc.stdin.write(f"{command} </dev/null {redirect}; printf '\\n{self._DONE}%s\\n' \"$?\"\n")
+        self._proc.stdin.flush()
+
+        lines: list[str] = []
+        for line in self._proc.stdout:
+            if line.startswith(self._DONE):
+                return int(line[len(self._DONE):]), "".join(lines).strip()
+            lines.append(line)
+        raise RuntimeError("gh session exited unexpectedly")
 
 
 def _provider_supported(provider: str) -> bool:
@@ -130,17 +245,32 @@ def cmd_install(provider: str) -> int:
     require_gh()
     aliases = _get_provider_aliases(_load_config(), provider)
 
-    for name in sorted(aliases):
-        cmd = aliases[name]
-        try:
-            _run_gh(["alias", "set", "--clobber", name, cmd], check=True)
-        except subprocess.CalledProcessError as exc:
-            details = (exc.stderr or "").strip()
-            if details:
-                _err(f"gh alias set failed for {name}: {details}")
-            else:
-                _err(f"gh alias set failed for {name}")
-            return EXIT_ENV
+    state = _load_state()
+    installed = state.get(provider)
+    if not isinstance(installed, dict) or os.environ.get("DOTWRAP_FORCE") == "1":
+        installed = {}
+
+    digests = {name: _digest(cmd) for name, cmd in aliases.items()}
+    pending = [name for name in aliases if installed.get(name) != digests[name]]
+
+    if pending:
+        with _GhSession() as gh:
+            for name in pending:
+                rc, details = gh.run(["alias", "set", "--clobber", name, aliases[name]])
+                if rc != 0:
+                    if details:
+                        _err(f"gh alias set failed for {name}: {details}")
+                    else:
+                        _err(f"gh alias set failed for {name}")
+                    # Part of this run may have reached gh; forget what was recorded
+                    # so the next install re-sends everything.
+                    if state.pop(provider, None) is not None:
+                        _save_state(state)
+                    return EXIT_ENV
+
+    if state.get(provider) != digests:
+        state[provider] = digests
+        _save_state(state)
 
     return EXIT_OK
 
@@ -150,9 +280,14 @@ def cmd_uninstall(provider: str) -> int:
     require_gh()
     aliases = _get_provider_aliases(_load_config(), provider)
 
-    for name in sorted(aliases):
-        # Requirement: ignore non-zero delete results.
-        _run_gh(["alias", "delete", name], check=False)
+    with _GhSession() as gh:
+        for name in aliases:
+            # Requirement: ignore non-zero delete results.
+            gh.run(["alias", "delete", name], capture=False)
+
+    state = _load_state()
+    if state.pop(provider, None) is not None:
+        _save_state(state)
 
     return EXIT_OK
 
@@ -162,7 +297,9 @@ def cmd_doctor(provider: str) -> int:
     require_gh()
 
     try:
-        proc = _run_gh(["alias", "list"], check=True)
+        for line in _iter_gh_lines(["alias", "list"]):
+            if _DW_LINE_RE.match(line):
+                _out(line)
     except subprocess.CalledProcessError as exc:
         details = (exc.stderr or "").strip()
         if details:
@@ -171,10 +308,6 @@ def cmd_doctor(provider: str) -> int:
             _err("gh alias list failed")
         return EXIT_ENV
 
-    for line in (proc.stdout or "").splitlines():
-        if line.lstrip().startswith(PREFIX):
-            _out(line)
-
     return EXIT_OK
 
 
@@ -73,6 +73,9 @@ if not args:
     sys.exit(2)
 
 if args[:2] == ["alias", "list"]:
+    # Tests can make gh chatty on stderr (more than a pipe buffer holds).
+    sys.stderr.write("x" * int(os.environ.get("DOTWRAP_GH_LIST_STDERR_BYTES", "0")))
+    sys.stderr.flush()
     # Mixed output to test dotwrap filtering.
     sys.stdout.write("dw_demo: pr list\n")
     sys.stdout.write("other: something\n")
@@ -98,6 +101,10 @@ if args[:2] == ["alias", "set"]:
 
     name = args[i]
     cmd = args[i + 1]
+    # Default: success (0). Tests can simulate a failing set for one alias.
+    if name == os.environ.get("DOTWRAP_GH_SET_FAIL"):
+        sys.stderr.write("could not set alias\n")
+        sys.exit(1)
     aliases = _load_aliases()
     aliases[name] = cmd
     _save_aliases(aliases)
@@ -185,7 +192,9 @@ class DotwrapCLITestCase(unittest.TestCase):
     def _write_aliases(self, content: str) -> None:
         (self.workdir / "aliases.toml").write_text(content, encoding="utf-8")
 
-    def _run(self, *args: str, env: dict | None = None) -> subprocess.CompletedProcess[str]:
+    def _run(
+        self, *args: str, env: dict | None = None, timeout: float | None = None
+    ) -> subprocess.CompletedProcess[str]:
         return subprocess.run(
             [
                 os.fspath(Path(sys.executable)),
@@ -196,6 +205,7 @@ class DotwrapCLITestCase(unittest.TestCase):
             env=env if env is not None else self.env,
             text=True,
             capture_output=True,
+            timeout=timeout,
         )
 
     def _logged_calls(self) -> list[list[str]]:
@@ -235,6 +245,19 @@ dw_prf = "!sh -c echo hi"
             ],
         )
 
+    def test_install_collapses_tabs_and_edge_spaces(self) -> None:
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+dw_tab = " pr\\tlist  --web "
+"""
+        )
+
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        calls = self._logged_calls()
+        self.assertEqual(calls, [["alias", "set", "--clobber", "dw_tab", "pr list --web"]])
+
     def test_install_sets_dw_prf_with_clobber(self) -> None:
         # Keep this focused: just asserts dw_prf is set with --clobber.
         self._write_aliases(
@@ -249,6 +272,148 @@ dw_prf = "!sh -c echo hi"
         calls = self._logged_calls()
         self.assertEqual(calls, [["alias", "set", "--clobber", "dw_prf", "!sh -c echo hi"]])
 
+    def test_install_reports_failing_alias_and_stops(self) -> None:
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+dw_a = "pr list"
+dw_b = "pr view"
+dw_c = "pr checkout"
+"""
+        )
+
+        env = dict(self.env)
+        env["DOTWRAP_GH_SET_FAIL"] = "dw_b"
+
+        proc = self._run("install", "gh", env=env)
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn("dotwrap: gh alias set failed for dw_b: could not set alias", proc.stderr)
+
+        calls = self._logged_calls()
+        self.assertEqual(
+            calls,
+            [
+                ["alias", "set", "--clobber", "dw_a", "pr list"],
+                ["alias", "set", "--clobber", "dw_b", "pr view"],
+            ],
+        )
+
+
+class TestMissingSh(DotwrapCLITestCase):
+    def test_missing_sh_exits_1_with_clear_message(self) -> None:
+        self._write_aliases("[providers.gh.aliases]\ndw_one = 'pr list'\n")
+
+        # PATH holds only the fake gh: require_gh finds it, but sh cannot start.
+        env = dict(self.env)
+        env["PATH"] = str(self.bin_dir)
+
+        proc = self._run("install", "gh", env=env)
+        self.assertEqual(proc.returncode, 1)
+        self.assertTrue(proc.stderr.startswith("dotwrap: missing required tool: sh"), msg=proc.stderr)
+
+
+class TestInstallState(DotwrapCLITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+dw_one = "pr list"
+dw_two = "pr view --web"
+"""
+        )
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.log_file.write_text("", encoding="utf-8")
+
+    def test_reinstall_unchanged_makes_no_gh_calls(self) -> None:
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertEqual(self._logged_calls(), [])
+
+    def test_reinstall_sends_only_changed_aliases(self) -> None:
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+dw_one = "pr list"
+dw_two = "pr view"
+dw_three = "pr checkout"
+"""
+        )
+
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertEqual(
+            self._logged_calls(),
+            [
+                ["alias", "set", "--clobber", "dw_three", "pr checkout"],
+                ["alias", "set", "--clobber", "dw_two", "pr view"],
+            ],
+        )
+
+    def test_failed_install_does_not_leave_stale_state(self) -> None:
+        # Change both aliases; dw_one reaches gh, then dw_two fails.
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+dw_one = "pr list --web"
+dw_two = "pr view"
+"""
+        )
+        env = dict(self.env)
+        env["DOTWRAP_GH_SET_FAIL"] = "dw_two"
+        proc = self._run("install", "gh", env=env)
+        self.assertEqual(proc.returncode, 1)
+
+        # Reverting the config must re-send dw_one, which the failed run changed in gh.
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+dw_one = "pr list"
+dw_two = "pr view --web"
+"""
+        )
+        self.log_file.write_text("", encoding="utf-8")
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertEqual(
+            self._logged_calls(),
+            [
+                ["alias", "set", "--clobber", "dw_one", "pr list"],
+                ["alias", "set", "--clobber", "dw_two", "pr view --web"],
+            ],
+        )
+
+    def test_force_resends_unchanged_aliases(self) -> None:
+        env = dict(self.env)
+        env["DOTWRAP_FORCE"] = "1"
+        proc = self._run("install", "gh", env=env)
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertEqual(len(self._logged_calls()), 2)
+
+    def test_force_other_than_1_keeps_skipping(self) -> None:
+        env = dict(self.env)
+        env["DOTWRAP_FORCE"] = "0"
+        proc = self._run("install", "gh", env=env)
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertEqual(self._logged_calls(), [])
+
+    def test_uninstall_clears_state(self) -> None:
+        self.assertTrue((self.workdir / ".dotwrap_state.json").exists())
+
+        proc = self._run("uninstall", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertFalse((self.workdir / ".dotwrap_state.json").exists())
+
+    def test_install_after_uninstall_resends_everything(self) -> None:
+        proc = self._run("uninstall", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.log_file.write_text("", encoding="utf-8")
+
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr)
+        self.assertEqual(len(self._logged_calls()), 2)
+
 
 class TestUninstall(DotwrapCLITestCase):
     def test_uninstall_deletes_each_alias_and_ignores_missing(self) -> None:
@@ -296,6 +461,14 @@ class TestDoctor(DotwrapCLITestCase):
         self.assertIn("dw_indented", proc.stdout)
         self.assertNotIn("other:", proc.stdout)
 
+    def test_doctor_does_not_block_on_large_gh_stderr(self) -> None:
+        env = dict(self.env)
+        env["DOTWRAP_GH_LIST_STDERR_BYTES"] = str(200 * 1024)
+
+        proc = self._run("doctor", "gh", env=env, timeout=30)
+        self.assertEqual(proc.returncode, 0, msg=proc.stderr[-200:])
+        self.assertIn("dotwrap: dw_demo: pr list", proc.stdout)
+
 
 class TestMissingGh(unittest.TestCase):
     def test_missing_gh_exits_1(self) -> None:
@@ -365,6 +538,19 @@ bad = "pr view"
         self.assertTrue((proc.stderr or proc.stdout).startswith("dotwrap:"))
         self.assertIn("invalid alias", (proc.stderr or proc.stdout).lower())
 
+    def test_alias_key_with_whitespace_exits_1(self) -> None:
+        self._write_aliases(
+            """[providers.gh.aliases]
+
+"dw_pr list" = "pr list"
+"""
+        )
+
+        proc = self._run("install", "gh")
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn("invalid alias key", proc.stderr)
+        self.assertEqual(self._logged_calls(), [])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)